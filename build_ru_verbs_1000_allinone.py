@@ -12,17 +12,24 @@ Usage
 -----
 pip install genanki pandas gTTS
 # (optional) install espeak-ng if you want offline TTS and use --espeak
+# (optional) with ffmpeg also installed, eSpeak audio is encoded to MP3 instead of WAV
 
 python build_ru_verbs_1000_allinone.py --out Russian_Verbs_1000_Literal.apkg
 # or to skip audio:
 python build_ru_verbs_1000_allinone.py --out deck.apkg --no-audio
 # or to use espeak-ng (must be installed):
 python build_ru_verbs_1000_allinone.py --out deck.apkg --espeak
+# or to multiplex gTTS requests over one asyncio event loop (pip install aiohttp):
+python build_ru_verbs_1000_allinone.py --out deck.apkg --async-tts
+# synthesized audio is cached in ~/.cache/ru_verbs_tts; to force re-synthesis:
+python build_ru_verbs_1000_allinone.py --out deck.apkg --no-cache
 
 Outputs
 -------
 - ./russian_verbs_1000.csv  (root_tag,russian,english_gloss,phrase_ru,literal_en)
 - ./Russian_Verbs_1000_Literal.apkg  (or name you choose with --out)
+- ./russian_verbs_1000.parquet  (same table, only with --parquet)
+- ./out/<name>_media/  (audio files, only with --keep-media)
 
 Card design (RU → EN)
 ---------------------
@@ -40,13 +47,24 @@ Generator uses productive prefixes + curated lists. Not every combo is equally f
 """
 
 import argparse
-import csv
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
 import os
 import random
 import re
+import shutil
+import sqlite3
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 try:
@@ -54,6 +72,8 @@ try:
 except Exception as e:
     raise SystemExit("Please 'pip install genanki' first. Error: {}".format(e))
 
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "ru_verbs_tts"
+
 PREFIXES = ["по", "про", "пере", "под", "при", "вы", "за", "на", "от", "до", "об", "с", "у", "вз", "в"]
 
 BASE_VERBS: List[Tuple[str, str, str]] = [
@@ -279,124 +299,340 @@ PHRASE_TEMPLATES = [
     ("Пожалуйста, не надо {inf}.", "Please, not need {inf}."),
 ]
 
-def build_candidate_forms():
-    candidates = []
+def _iter_raw_forms():
+    inf_to_root: Dict[str, str] = {}
+    for root, inf, _ in BASE_VERBS:
+        inf_to_root.setdefault(inf, root)
 
-    for root, inf, gloss in BASE_VERBS:
-        candidates.append((root, inf, gloss))
+    yield from BASE_VERBS
 
     for base_inf, pairs in CURATED_DERIVS.items():
-        root = next((r for r, v, g in BASE_VERBS if v == base_inf), base_inf[:3] + "-")
+        root = inf_to_root.get(base_inf, base_inf[:3] + "-")
         for v, g in pairs:
-            candidates.append((root, v, g))
-
-    def add_pref(root: str, inf: str, gloss_base: str):
-        for p in PREFIXES:
-            formed = p + inf
-            if formed == inf:
-                continue
-            candidates.append((root, formed, f"{gloss_base} (prefixed)"))
-
-    for root, inf, gloss in BASE_VERBS:
-        if inf in CURATED_DERIVS:
+            yield root, v, g
+
+    # Prefix x infinitive cartesian product in one broadcast call: row i holds every prefix + inf i.
+    pref_bases = [(root, inf, gloss) for root, inf, gloss in BASE_VERBS if inf not in CURATED_DERIVS]
+    infs = np.array([inf for _, inf, _ in pref_bases])
+    formed = np.char.add(np.array(PREFIXES)[None, :], infs[:, None])
+    for (root, _, gloss), forms in zip(pref_bases, formed.tolist()):
+        gloss_pref = f"{gloss} (prefixed)"
+        for v in forms:
+            yield root, v, gloss_pref
+
+    # Deterministic top-up forms (p1 + p2 + inf), only reached if the stages above run short.
+    for root, inf, gloss in pref_bases:
+        gloss_pref = f"{gloss} (prefixed)"
+        for p1 in PREFIXES:
+            for p2 in PREFIXES:
+                yield root, p1 + p2 + inf, gloss_pref
+
+def iter_candidate_forms():
+    seen = set()
+    for root, v, g in _iter_raw_forms():
+        if v in seen:
             continue
-        add_pref(root, inf, gloss)
+        seen.add(v)
+        yield root, v, g
 
-    seen = set()
-    uniq = []
-    for root, v, g in candidates:
-        if v not in seen:
-            uniq.append((root, v, g))
-            seen.add(v)
-    return uniq
+# Templates pre-split on "{inf}" so rendering a phrase is a str.join, not a format parse.
+_SPLIT_TEMPLATES = [(t_ru.split("{inf}"), t_en.split("{inf}")) for t_ru, t_en in PHRASE_TEMPLATES]
 
-def make_phrases(verb: str, idx: int):
-    t_ru, t_en = PHRASE_TEMPLATES[idx % len(PHRASE_TEMPLATES)]
-    return t_ru.format(inf=verb), t_en.format(inf=verb)
+def make_phrase_columns(verbs: List[str]) -> Tuple[List[str], List[str]]:
+    # Row i uses template i % len(templates); cycle gives that order without index arithmetic.
+    tpls = list(zip(verbs, itertools.cycle(_SPLIT_TEMPLATES)))
+    phrases = [v.join(ru_parts) for v, (ru_parts, _) in tpls]
+    literals = [v.join(en_parts) for v, (_, en_parts) in tpls]
+    return phrases, literals
+
+_SAFE_NAME_RE = re.compile(r'[^0-9a-zA-Zа-яА-ЯёЁ_.-]+')
 
 def safe_name(s: str) -> str:
-    return re.sub(r'[^0-9a-zA-Zа-яА-ЯёЁ_.-]+', '_', s)
+    return _SAFE_NAME_RE.sub('_', s)
+
+_GTTS_SESSION = None
+
+class _KeepAliveSession:
+    # `with requests.Session() as s:` in gtts would close the pool; hand out the shared one instead.
+    def __init__(self, session):
+        self.session = session
+
+    def __enter__(self):
+        return self.session
+
+    def __exit__(self, *exc):
+        return False
+
+class _SharedSessionRequests:
+    # Stand-in for the `requests` module as seen by gtts.tts; everything but Session() is passed through.
+    def __init__(self, requests_mod, session):
+        self._requests = requests_mod
+        self._session = session
+
+    def Session(self):
+        return _KeepAliveSession(self._session)
+
+    def __getattr__(self, name):
+        return getattr(self._requests, name)
+
+def use_shared_gtts_session(pool_size: int = 32):
+    # gTTS opens a new requests.Session (new TCP + TLS handshake) for every phrase;
+    # route all of them through one keep-alive connection pool instead.
+    global _GTTS_SESSION
+    if _GTTS_SESSION is not None:
+        return
+    import requests
+    import gtts.tts
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    gtts.tts.requests = _SharedSessionRequests(requests, session)
+    _GTTS_SESSION = session
 
 def synth_audio_gtts(text_ru: str, path: Path):
     from gtts import gTTS
     tts = gTTS(text_ru, lang='ru')
     tts.save(str(path))
 
+def espeak_ext() -> str:
+    # MP3 when ffmpeg is around to encode it (~10x smaller than WAV in the .apkg), otherwise raw WAV.
+    return ".mp3" if shutil.which("ffmpeg") else ".wav"
+
 def synth_audio_espeak(text_ru: str, path: Path):
     import subprocess
-    wav = str(path.with_suffix('.wav'))
-    subprocess.run(["espeak-ng", "-v", "ru", "-s", "150", "-w", wav, text_ru], check=True)
-
-def build_anki(deck_name: str, rows, out_apkg: Path, audio_mode: str = "gtts"):
-    model = genanki.Model(
-        1607392321,
-        "RU Verbs – Literal & Audio",
-        fields=[
-            {"name": "Russian"},
-            {"name": "English"},
-            {"name": "PhraseRU"},
-            {"name": "LiteralEN"},
-            {"name": "Audio"},
-            {"name": "Tags"},
-        ],
-        templates=[
-            {
-                "name": "RU→EN Verb",
-                "qfmt": "<div style='font-size:28px'>{{Russian}}</div>",
-                "afmt": """
+    if path.suffix != ".mp3":
+        # -w lets espeak-ng seek back and fill in the RIFF/data sizes; --stdout leaves placeholders.
+        subprocess.run(["espeak-ng", "-v", "ru", "-s", "150", "-w", str(path), text_ru], check=True)
+        return
+    wav = subprocess.run(["espeak-ng", "-v", "ru", "-s", "150", "--stdout", text_ru],
+                         capture_output=True, check=True).stdout
+    mp3 = subprocess.run(["ffmpeg", "-loglevel", "error", "-f", "wav", "-i", "pipe:0", "-f", "mp3", "pipe:1"],
+                         input=wav, capture_output=True, check=True).stdout
+    path.write_bytes(mp3)
+
+SYNTH_FUNCS = {"gtts": synth_audio_gtts, "espeak": synth_audio_espeak}
+
+def _cache_path(text_ru: str, suffix: str, mode: str, cache_dir: Path) -> Path:
+    key = hashlib.sha256((mode + "|" + text_ru).encode("utf-8")).hexdigest()
+    return cache_dir / (key + suffix)
+
+def cache_fetch(text_ru: str, path: Path, mode: str, cache_dir: Optional[Path]) -> bool:
+    if cache_dir is None:
+        return False
+    cached = _cache_path(text_ru, path.suffix, mode, cache_dir)
+    if not cached.is_file():
+        return False
+    shutil.copyfile(cached, path)
+    return True
+
+def cache_store(text_ru: str, path: Path, mode: str, cache_dir: Optional[Path]):
+    if cache_dir is None:
+        return
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    os.close(fd)
+    shutil.copyfile(path, tmp)
+    os.replace(tmp, _cache_path(text_ru, path.suffix, mode, cache_dir))
+
+def cached_synth(text_ru: str, path: Path, mode: str, cache_dir: Optional[Path] = DEFAULT_CACHE_DIR):
+    if cache_fetch(text_ru, path, mode, cache_dir):
+        return
+    SYNTH_FUNCS[mode](text_ru, path)
+    cache_store(text_ru, path, mode, cache_dir)
+
+_GTTS_AUDIO_RE = re.compile(r'jQ1olc","\[\\"(.*)\\"]')
+
+async def synth_one(session, text_ru: str, path: Path, sem: asyncio.Semaphore):
+    # Same batchexecute request gTTS would send, but on a shared aiohttp session.
+    from gtts import gTTS
+    parts = []
+    async with sem:
+        for pr in gTTS(text_ru, lang='ru')._prepare_requests():
+            async with session.post(pr.url, data=pr.body, headers=gTTS.GOOGLE_TTS_HEADERS) as resp:
+                resp.raise_for_status()
+                body = await resp.text()
+            m = _GTTS_AUDIO_RE.search(body)
+            if m is None:
+                raise RuntimeError(f"gTTS returned no audio for {text_ru!r}")
+            parts.append(base64.b64decode(m.group(1)))
+    path.write_bytes(b"".join(parts))
+
+async def synth_all_async(jobs: List[Tuple[str, Path]], limit: int = 64):
+    # Semaphore(0) would block every request forever and TCPConnector(limit=0) means unlimited.
+    if limit < 1:
+        raise ValueError(f"limit must be at least 1, got {limit}")
+    try:
+        import aiohttp
+    except Exception as e:
+        raise SystemExit("Please 'pip install aiohttp' to use --async-tts. Error: {}".format(e))
+    sem = asyncio.Semaphore(limit)
+    connector = aiohttp.TCPConnector(limit=limit, ttl_dns_cache=600)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        await asyncio.gather(*(synth_one(session, text_ru, path, sem) for text_ru, path in jobs))
+
+VERB_MODEL = genanki.Model(
+    1607392321,
+    "RU Verbs – Literal & Audio",
+    fields=[
+        {"name": "Russian"},
+        {"name": "English"},
+        {"name": "PhraseRU"},
+        {"name": "LiteralEN"},
+        {"name": "Audio"},
+        {"name": "Tags"},
+    ],
+    templates=[
+        {
+            "name": "RU→EN Verb",
+            "qfmt": "<div style='font-size:28px'>{{Russian}}</div>",
+            "afmt": """
 <div style='font-size:24px'><b>{{English}}</b></div>
 <div style='margin-top:8px'>{{PhraseRU}}</div>
 <div style='color:#555'>Literal: {{LiteralEN}}</div>
 <div style='margin-top:8px'>{{Audio}}</div>
 <div style='font-size:12px;color:#888;margin-top:8px'>{{Tags}}</div>
                 """,
-            }
-        ],
-        css=".card { font-family: system-ui, -apple-system, Segoe UI, Roboto, sans-serif; font-size: 20px; color: #222; background: #fff; }",
-    )
+        }
+    ],
+    css=".card { font-family: system-ui, -apple-system, Segoe UI, Roboto, sans-serif; font-size: 20px; color: #222; background: #fff; }",
+)
+
+_EMPTY_TAGS = ()
+
+class PrefetchPackage(genanki.Package):
+    # Same archive layout (and ZIP_STORED, genanki's default) as genanki.Package, but media bytes
+    # are read concurrently up front and the temporary collection DB is removed afterwards.
+    def __init__(self, deck_or_decks=None, media_files=None, read_workers: int = 16):
+        super().__init__(deck_or_decks, media_files)
+        self.read_workers = read_workers
+
+    def write_to_file(self, file, timestamp: Optional[float] = None):
+        dbfile, dbfilename = tempfile.mkstemp()
+        os.close(dbfile)
+        try:
+            conn = sqlite3.connect(dbfilename)
+            if timestamp is None:
+                timestamp = time.time()
+            self.write_to_db(conn.cursor(), timestamp, itertools.count(int(timestamp * 1000)))
+            conn.commit()
+            conn.close()
+
+            with zipfile.ZipFile(file, "w", compression=zipfile.ZIP_STORED) as outzip:
+                outzip.write(dbfilename, "collection.anki2")
+                media_json = {idx: os.path.basename(path) for idx, path in enumerate(self.media_files)}
+                outzip.writestr("media", json.dumps(media_json))
+                with ThreadPoolExecutor(max_workers=self.read_workers) as ex:
+                    for idx, data in enumerate(ex.map(lambda p: Path(p).read_bytes(), self.media_files)):
+                        outzip.writestr(str(idx), data)
+        finally:
+            os.remove(dbfilename)
+
+def synth_all(rows: pd.DataFrame, media_dir: Path, audio_mode: str = "gtts", tts_workers: int = 32,
+              cache_dir: Optional[Path] = DEFAULT_CACHE_DIR, async_tts: bool = False) -> Tuple[Dict[str, str], List[str]]:
+    # Returns phrase_ru -> "[sound:...]" and the media paths; each distinct phrase is synthesized once.
+    audio_map: Dict[str, str] = {}
+    media_files: List[str] = []
+    if audio_mode not in SYNTH_FUNCS:
+        return audio_map, media_files
+
+    ext = ".mp3" if audio_mode == "gtts" else espeak_ext()
+    jobs = []
+    for i, r in enumerate(rows.itertuples(index=False)):
+        phr_ru = r.phrase_ru
+        if phr_ru in audio_map:
+            continue
+        outp = media_dir / f"{safe_name(r.russian)}_{i}{ext}"
+        jobs.append((phr_ru, outp))
+        media_files.append(str(outp))
+        audio_map[phr_ru] = f"[sound:{outp.name}]"
+
+    # TTS is network/process bound, not CPU bound, so run the jobs concurrently
+    if audio_mode == "gtts" and async_tts:
+        misses = [(phr_ru, outp) for phr_ru, outp in jobs if not cache_fetch(phr_ru, outp, audio_mode, cache_dir)]
+        asyncio.run(synth_all_async(misses, limit=tts_workers))
+        for phr_ru, outp in misses:
+            cache_store(phr_ru, outp, audio_mode, cache_dir)
+    else:
+        workers = tts_workers
+        if audio_mode == "gtts":
+            use_shared_gtts_session(pool_size=tts_workers)
+        if audio_mode == "espeak":
+            # espeak-ng is CPU bound and can't write one WAV per input line from a single
+            # process, so keep at most one synth process per core instead of oversubscribing.
+            workers = min(tts_workers, os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            futures = [ex.submit(cached_synth, phr_ru, outp, audio_mode, cache_dir) for phr_ru, outp in jobs]
+            for fut in as_completed(futures):
+                fut.result()
+    return audio_map, media_files
+
+def build_anki(deck_name: str, rows: pd.DataFrame, out_apkg: Path, audio_map: Dict[str, str],
+               media_files: List[str]):
     deck = genanki.Deck(2059400121, deck_name)
 
-    media_dir = out_apkg.parent /'out'/(out_apkg.stem + "_media")
-    media_dir.mkdir(parents=True, exist_ok=True)
-    media_files = []
-
-    for i, r in enumerate(rows):
-        ru = r["russian"]
-        en = r["english_gloss"]
-        phr_ru = r["phrase_ru"]
-        lit_en = r["literal_en"]
-        tag = r["root_tag"]
-
-        audio_html = ""
-        if audio_mode != "none":
-            fname = f"{safe_name(ru)}_{i}.mp3" if audio_mode == "gtts" else f"{safe_name(ru)}_{i}.wav"
-            outp = media_dir / fname
-            if audio_mode == "gtts":
-                synth_audio_gtts(phr_ru, outp)
-            elif audio_mode == "espeak":
-                synth_audio_espeak(phr_ru, outp)
-            media_files.append(str(outp))
-            audio_html = f"[sound:{outp.name}]"
-
+    # Key notes on the headword alone so editing gloss/phrase in the CSV updates notes on re-import.
+    guids = [genanki.guid_for(ru) for ru in rows["russian"]]
+    cols = rows[["root_tag", "russian", "english_gloss", "phrase_ru", "literal_en"]]
+    for guid, (tag, ru, en, phr_ru, lit_en) in zip(guids, cols.itertuples(index=False, name=None)):
         note = genanki.Note(
-            model=model,
-            fields=[ru, en, phr_ru, lit_en, audio_html, tag],
-            tags=[tag] if tag else [],
+            model=VERB_MODEL,
+            fields=(ru, en, phr_ru, lit_en, audio_map.get(phr_ru, ""), tag),
+            tags=(tag,) if tag else _EMPTY_TAGS,
+            guid=guid,
         )
         deck.add_note(note)
 
-    pkg = genanki.Package(deck)
+    pkg = PrefetchPackage(deck)
     if media_files:
         pkg.media_files = media_files
     pkg.write_to_file(str(out_apkg))
 
+def write_tables(df: pd.DataFrame, csv_path: Path, parquet: bool = False) -> Optional[Path]:
+    df.to_csv(csv_path, index=False, encoding="utf-8")
+    if not parquet:
+        return None
+    parquet_path = csv_path.with_suffix(".parquet")
+    try:
+        df.to_parquet(parquet_path, index=False)
+    except ImportError as e:
+        raise SystemExit("Please 'pip install pyarrow' to use --parquet. Error: {}".format(e))
+    return parquet_path
+
+def require_parquet_engine():
+    # Same engines pandas' to_parquet(engine="auto") tries; checked up front so a missing one
+    # fails before the TTS phase instead of after it.
+    for mod in ("pyarrow", "fastparquet"):
+        try:
+            __import__(mod)
+            return
+        except ImportError:
+            continue
+    raise SystemExit("Please 'pip install pyarrow' to use --parquet.")
+
+def positive_int(value: str) -> int:
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return n
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--out", default="Russian_Verbs_1000_Literal.apkg", help="Output .apkg filename")
     ap.add_argument("--no-audio", action="store_true", help="Disable audio generation")
     ap.add_argument("--espeak", action="store_true", help="Use eSpeak NG (offline) instead of gTTS")
     ap.add_argument("--deck-name", default="Russian Verbs 1000 – Literal & Audio", help="Deck name")
+    ap.add_argument("--tts-workers", type=positive_int, default=32, help="Number of concurrent TTS requests")
+    ap.add_argument("--async-tts", action="store_true", help="Send gTTS requests on one asyncio event loop (needs aiohttp)")
+    ap.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR), help="Directory for cached phrase audio")
+    ap.add_argument("--no-cache", action="store_true", help="Always re-synthesize audio, ignoring the cache")
+    ap.add_argument("--parquet", action="store_true", help="Also write the table as russian_verbs_1000.parquet (needs pyarrow)")
+    ap.add_argument("--keep-media", action="store_true", help="Also keep the audio files under ./out/<deck>_media")
     args = ap.parse_args()
+    if args.parquet:
+        require_parquet_engine()
 
     audio_mode = "gtts"
     if args.no_audio:
@@ -405,53 +641,44 @@ def main():
         audio_mode = "espeak"
 
     # Generate candidates and pick 1000
-    cands = build_candidate_forms()
+    picked = list(itertools.islice(iter_candidate_forms(), 1000))
+    roots, verbs, glosses = (list(col) for col in zip(*picked))
 
-    rows = []
-    seen = set()
-    for root, v, g in cands:
-        if v in seen:
-            continue
-        seen.add(v)
-        phr_ru, lit_en = make_phrases(v, len(rows))
-        rows.append({
-            "root_tag": root,
-            "russian": v,
-            "english_gloss": g,
-            "phrase_ru": phr_ru,
-            "literal_en": lit_en,
-        })
-        if len(rows) >= 1000:
-            break
-
-    # If fewer than 1000, loop again
-    i = 0
-    while len(rows) < 1000:
-        root, v, g = cands[i % len(cands)]
-        if v not in seen:
-            seen.add(v)
-            phr_ru, lit_en = make_phrases(v, len(rows))
-            rows.append({
-                "root_tag": root,
-                "russian": v,
-                "english_gloss": g,
-                "phrase_ru": phr_ru,
-                "literal_en": lit_en,
-            })
-        i += 1
-
-    # Save CSV
-    csv_path = Path("russian_verbs_1000.csv")
-    with open(csv_path, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=["root_tag","russian","english_gloss","phrase_ru","literal_en"])
-        writer.writeheader()
-        writer.writerows(rows)
+    phrases, literals = make_phrase_columns(verbs)
 
-    # Build deck
-    out_apkg = Path(args.out)
-    build_anki(args.deck_name, rows, out_apkg, audio_mode=audio_mode)
+    df = pd.DataFrame({
+        "root_tag": roots,
+        "russian": verbs,
+        "english_gloss": glosses,
+        "phrase_ru": phrases,
+        "literal_en": literals,
+    })
 
-    print(f"Generated CSV: {csv_path.resolve()} ({len(rows)} rows)")
+    csv_path = Path("russian_verbs_1000.csv")
+    out_apkg = Path(args.out)
+    cache_dir = None if args.no_cache else Path(args.cache_dir).expanduser()
+
+    # Stage media in RAM (/dev/shm) when available; it is only read back once by the packager.
+    shm = Path("/dev/shm")
+    media_dir = Path(tempfile.mkdtemp(prefix="ru_verbs_media_", dir=shm if shm.is_dir() else None))
+    try:
+        # Save CSV in the background while TTS requests are in flight
+        with ThreadPoolExecutor(max_workers=1) as io_pool:
+            tables_job = io_pool.submit(write_tables, df, csv_path, args.parquet)
+            audio_map, media_files = synth_all(df, media_dir, audio_mode, tts_workers=args.tts_workers,
+                                               cache_dir=cache_dir, async_tts=args.async_tts)
+            parquet_path = tables_job.result()
+
+        # Build deck
+        build_anki(args.deck_name, df, out_apkg, audio_map, media_files)
+        if args.keep_media and media_files:
+            shutil.copytree(media_dir, out_apkg.parent / 'out' / (out_apkg.stem + "_media"), dirs_exist_ok=True)
+    finally:
+        shutil.rmtree(media_dir, ignore_errors=True)
+
+    print(f"Generated CSV: {csv_path.resolve()} ({len(df)} rows)")
+    if parquet_path is not None:
+        print(f"Parquet:      {parquet_path.resolve()}")
     print(f"Built deck:   {out_apkg.resolve()}")
     if audio_mode != "none":
         print(f"Audio:        {'gTTS' if audio_mode=='gtts' else 'eSpeak NG'}")